@@ -111,6 +111,9 @@ if __name__ == '__main__':
     assignment_parser.set_defaults(func=_assignment_email)
     assignment_parser.add_argument(
         'assignment', help='Name of the target assignment')
+    assignment_parser.add_argument(
+        '-j', '--jobs', default=1, type=int,
+        help='Number of threads for signing emails and loading grades')
     student_parser = email_subparsers.add_parser(
         'student', help=_student_email.__doc__.splitlines()[0])
     student_parser.set_defaults(func=_student_email)
@@ -120,6 +123,9 @@ if __name__ == '__main__':
     student_parser.add_argument(
         '-s', '--student', dest='student',
         help='Explicitly select the student to notify (instead of everyone)')
+    student_parser.add_argument(
+        '-j', '--jobs', default=1, type=int,
+        help='Number of threads for signing emails and loading grades')
     course_parser = email_subparsers.add_parser(
         'course', help=_course_email.__doc__.splitlines()[0])
     course_parser.set_defaults(func=_course_email)
@@ -164,6 +170,10 @@ if __name__ == '__main__':
         default=False, action='store_const', const=True,
         help=('Send responses to invalid messages and continue processing '
               'further emails (default is to die with an error message).'))
+    mailpipe_parser.add_argument(
+        '-j', '--jobs', default=1, type=int,
+        help=('Number of threads for verifying mailbox messages and '
+              'loading grades'))
 
     todo_parser = subparsers.add_parser(
         'todo', help=_todo.__doc__.splitlines()[0])
@@ -172,6 +182,9 @@ if __name__ == '__main__':
         'source', help='Name of source file/directory')
     todo_parser.add_argument(
         'target', help='Name of target file/directory')
+    todo_parser.add_argument(
+        '-j', '--jobs', default=1, type=int,
+        help='Number of threads for comparing sources with targets')
 
 
 #    p.add_option('-t', '--template', default=None)
@@ -211,7 +224,8 @@ if __name__ == '__main__':
         kwargs['basedir'] = args.basedir
 
     if 'course' in func_args:
-        course = _load_course(basedir=args.basedir)
+        course = _load_course(
+            basedir=args.basedir, jobs=getattr(args, 'jobs', 1))
         active_groups = course.active_groups()
         kwargs['course'] = course
         if hasattr(args, 'assignment'):
@@ -238,7 +252,7 @@ if __name__ == '__main__':
                         kwargs[attr].extend(course.find_people(name=person))
         for attr in ['dry_run', 'mailbox', 'output', 'input_', 'max_late',
                      'old', 'statistics', 'trust_email_infrastructure',
-                     'continue_after_invalid_message']:
+                     'continue_after_invalid_message', 'jobs']:
             if hasattr(args, attr):
                 kwargs[attr] = getattr(args, attr)
     elif args.func == _test_smtp:
@@ -246,7 +260,7 @@ if __name__ == '__main__':
             if hasattr(args, attr):
                 kwargs[attr] = getattr(args, attr)
     elif args.func == _todo:
-        for attr in ['source', 'target']:
+        for attr in ['source', 'target', 'jobs']:
             if hasattr(args, attr):
                 kwargs[attr] = getattr(args, attr)
 
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License along with
 # pygrader.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections as _collections
 import logging as _logging
 
 from .color import ColoredFormatter as _ColoredFormatter
@@ -28,3 +29,33 @@ LOG.setLevel(_logging.ERROR)
 LOG.addHandler(_logging.StreamHandler())
 LOG_FORMATTER = _ColoredFormatter()
 LOG.handlers[0].setFormatter(LOG_FORMATTER)
+
+
+def map_jobs(function, iterable, jobs=1):
+    """Lazily yield ``function(item)`` for each item, in order.
+
+    Setting ``jobs`` greater than one runs the calls in that many
+    threads.  Only ``2*jobs`` calls are queued ahead of the consumer,
+    and closing the generator early cancels the queued calls.
+
+    >>> list(map_jobs(abs, [-1, 2, -3], jobs=2))
+    [1, 2, 3]
+    """
+    if jobs <= 1:
+        for item in iterable:
+            yield function(item)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    pending = _collections.deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= 2*jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
@@ -17,11 +17,15 @@
 
 from __future__ import absolute_import
 
+from email.generator import BytesGenerator as _BytesGenerator
 from email.header import Header as _Header
 from email.header import decode_header as _decode_header
 from email.mime.message import MIMEMessage as _MIMEMessage
 from email.mime.multipart import MIMEMultipart as _MIMEMultipart
+import email.policy as _email_policy
 import email.utils as _email_utils
+import functools as _functools
+import io as _io
 import logging as _logging
 import smtplib as _smtplib
 
@@ -32,6 +36,9 @@ from . import LOG as _LOG
 from .model.person import Person as _Person
 
 
+_SMTP_POLICY = _email_policy.compat32.clone(linesep='\r\n')
+
+
 def test_smtp(smtp, author, targets, msg=None):
     """Test the SMTP connection by sending a message to `target`
     """
@@ -65,42 +72,84 @@ def send_emails(emails, smtp=None, debug_target=None, dry_run=False):
     SUCCESS: None
     SUCCESS: None
     """
-    local_smtp = smtp is None
-    for msg,callback in emails:
-        sources = [
-            _email_utils.formataddr(a) for a in _pgp_mime.email_sources(msg)]
-        author = sources[0]
-        targets = [
-            _email_utils.formataddr(a) for a in _pgp_mime.email_targets(msg)]
-        _pgp_mime.strip_bcc(msg)
-        if _LOG.level <= _logging.DEBUG:
-            # TODO: remove convert_content_transfer_encoding?
-            #if msg.get('content-transfer-encoding', None) == 'base64':
-            #    convert_content_transfer_encoding(msg, '8bit')
-            _LOG.debug('\n{}\n'.format(msg.as_string()))
-        _LOG.info('sending message to {}...'.format(targets))
-        if not dry_run:
-            try:
-                if local_smtp:
-                    smtp = _smtplib.SMTP('localhost')
-                if debug_target:
-                    targets = [debug_target]
-                smtp.sendmail(author, targets, msg.as_string())
-                if local_smtp:
-                    smtp.quit()
-            except:
-                _LOG.warning('failed to send message to {}'.format(targets))
-                if callback:
-                    callback(False)
-                raise
+    local_smtp = smtp is None  # share one localhost connection
+    try:
+        for msg,callback in emails:
+            sources = [
+                _email_utils.formataddr(a)
+                for a in _pgp_mime.email_sources(msg)]
+            author = sources[0]
+            targets = [
+                _email_utils.formataddr(a)
+                for a in _pgp_mime.email_targets(msg)]
+            _pgp_mime.strip_bcc(msg)
+            if _LOG.level <= _logging.DEBUG:
+                # TODO: remove convert_content_transfer_encoding?
+                #if msg.get('content-transfer-encoding', None) == 'base64':
+                #    convert_content_transfer_encoding(msg, '8bit')
+                _LOG.debug('\n{}\n'.format(msg.as_string()))
+            _LOG.info('sending message to {}...'.format(targets))
+            if not dry_run:
+                try:
+                    if smtp is None:
+                        smtp = _smtplib.SMTP('localhost')
+                    if debug_target:
+                        targets = [debug_target]
+                    data = _flatten(msg)
+                    try:
+                        smtp.sendmail(author, targets, data)
+                    except _smtplib.SMTPServerDisconnected:
+                        if not local_smtp:
+                            raise
+                        _LOG.info('reconnecting to localhost')
+                        smtp = None
+                        smtp = _smtplib.SMTP('localhost')
+                        smtp.sendmail(author, targets, data)
+                except:
+                    _LOG.warning(
+                        'failed to send message to {}'.format(targets))
+                    if callback:
+                        callback(False)
+                    raise
+                else:
+                    _LOG.info('sent message to {}'.format(targets))
+                    if callback:
+                        callback(True)
             else:
-                _LOG.info('sent message to {}'.format(targets))
+                _LOG.info(
+                    'dry run, so no message sent to {}'.format(targets))
                 if callback:
-                    callback(True)
-        else:
-            _LOG.info('dry run, so no message sent to {}'.format(targets))
-            if callback:
-                callback(None)
+                    callback(None)
+    finally:
+        if local_smtp and smtp is not None:
+            try:
+                smtp.quit()
+            except _smtplib.SMTPServerDisconnected:
+                pass
+
+def _flatten(msg):
+    r"""Serialize `msg` straight to bytes for ``SMTP.sendmail``
+
+    This skips the intermediate string (and its re-encoding) that
+    ``msg.as_string()`` would produce.  Like ``as_string()``, long
+    headers are not refolded and 'From ' lines are not mangled.
+    ``sendmail`` only fixes line endings in ``str`` messages, so lines
+    are written with the CRLF endings SMTP requires.
+
+    >>> from email.mime.text import MIMEText
+    >>> msg = MIMEText('From here on,\nhowdy!', 'plain', 'us-ascii')
+    >>> msg['Subject'] = 'Hi'
+    >>> _flatten(msg) == msg.as_string().replace(
+    ...     '\n', '\r\n').encode('us-ascii')
+    True
+    >>> _flatten(msg).count(b'\n') == _flatten(msg).count(b'\r\n')
+    True
+    """
+    stream = _io.BytesIO()
+    _BytesGenerator(
+        stream, mangle_from_=False, maxheaderlen=0, policy=_SMTP_POLICY
+        ).flatten(msg)
+    return stream.getvalue()
 
 
 class Responder (object):
@@ -133,9 +182,17 @@ def get_address(person):
     :RFC:`2822`, which limits the locations in which encoded words may
     appear.
     """
-    encoding = _pgp_mime.guess_encoding(person.name)
-    return _email_utils.formataddr(
-        (person.name, person.emails[0]), charset=encoding)
+    return _format_address(person.name, person.emails[0])
+
+@_functools.lru_cache(maxsize=256)
+def _format_address(name, address):
+    """Format one address header entry (see `get_address`)
+
+    Keyed on the name and address rather than the `Person`, so people
+    whose attributes change still get a fresh header.
+    """
+    encoding = _pgp_mime.guess_encoding(name)
+    return _email_utils.formataddr((name, address), charset=encoding)
 
 def construct_email(author, targets, subject, message, cc=None):
     if author.pgp_key:
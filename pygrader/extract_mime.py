@@ -20,8 +20,8 @@
 from __future__ import absolute_import
 
 import email.utils as _email_utils
+import functools as _functools
 import hashlib as _hashlib
-import mailbox as _mailbox
 import os as _os
 import os.path as _os_path
 import time as _time
@@ -50,7 +50,19 @@ def message_time(message):
         mid = message['Message-ID']
         _LOG.debug('no Received in {}'.format(mid))
         return None
-    date = received.split(';', 1)[1]
+    if isinstance(received, str):
+        return _received_time(received)
+    # Header instances are unhashable, so skip the cache
+    return _received_time.__wrapped__(received)
+
+@_functools.lru_cache(maxsize=1024)
+def _received_time(received):
+    """Parse the date from a raw Received header value
+
+    Cached because mailpipe parses each message's time once to sort
+    the mailbox and again in the handlers.
+    """
+    date = str(received).split(';', 1)[1]
     return _time.mktime(_email_utils.parsedate(date))
 
 def extract_mime(message, mime_type=None, output='.', dry_run=False):
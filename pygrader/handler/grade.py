@@ -20,7 +20,6 @@ Allow professors and TAs to assign grades via email.
 """
 
 import io as _io
-import mailbox as _mailbox
 import os.path as _os_path
 
 import pgp_mime as _pgp_mime
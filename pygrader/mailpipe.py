@@ -18,18 +18,27 @@
 
 from __future__ import absolute_import
 
+import collections as _collections
+import copy as _copy
+from email import message_from_binary_file as _message_from_binary_file
+from email import message_from_bytes as _message_from_bytes
 from email import message_from_file as _message_from_file
 from email.header import decode_header as _decode_header
 from email.mime.text import MIMEText as _MIMEText
 from email.utils import parseaddr as _parseaddr
+import functools as _functools
+import hashlib as _hashlib
+import io as _io
+import logging as _logging
 import mailbox as _mailbox
-import re as _re
 import sys as _sys
+import threading as _threading
 
 import pgp_mime as _pgp_mime
 import pgp_mime.key as _pgp_mime_key
 
 from . import LOG as _LOG
+from . import map_jobs as _map_jobs
 from .email import construct_email as _construct_email
 from .email import construct_response as _construct_response
 from .extract_mime import message_time as _message_time
@@ -50,7 +59,30 @@ from .handler.submission import run as _handle_submission
 from .handler.submission import InvalidSubmission as _InvalidSubmission
 
 
-_TAG_REGEXP = _re.compile('^.*\[([^]]*)\].*$')
+# PGP/MIME content types and their required ``protocol`` parameters
+# (RFC 3156).  Anything else can't be signed, so there's no need to
+# ask GnuPG about it.
+_PGP_MIME_PROTOCOLS = {
+    'multipart/signed': 'application/pgp-signature',
+    'multipart/encrypted': 'application/pgp-encrypted',
+    }
+
+# Headers that describe the signed envelope rather than the decrypted
+# payload, so they are not copied over after verification.
+_SKIP_HEADERS = frozenset([
+        'content-type',
+        'mime-version',
+        'content-disposition',
+        ])
+
+# Successfully verified messages, keyed by ``(pgp_key, digest)`` of
+# the signed original, so a message seen again (duplicate deliveries,
+# repeated runs in the same process) doesn't go back to GnuPG.  The
+# cache is deliberately in-memory only, so key revocations take effect
+# on the next run.
+_VERIFIED_CACHE = _collections.OrderedDict()
+_VERIFIED_CACHE_SIZE = 256
+_VERIFIED_CACHE_LOCK = _threading.Lock()
 
 
 class NoReturnPath (_InvalidMessage):
@@ -121,7 +153,7 @@ def mailpipe(basedir, course, stream=None, mailbox=None, input_=None,
         'get': _handle_get,
         'grade': _handle_grade,
         'submit': _handle_submission,
-        }, respond=None, dry_run=False, **kwargs):
+        }, respond=None, dry_run=False, jobs=1, **kwargs):
     """Run from procmail to sort incomming submissions
 
     For example, you can setup your ``.procmailrc`` like this::
@@ -143,6 +175,11 @@ def mailpipe(basedir, course, stream=None, mailbox=None, input_=None,
     If you don't want procmail to eat the message, you can use the
     ``c`` flag (carbon copy) by starting your rule off with ``:0 c``.
 
+    When processing a whole mailbox, setting ``jobs`` greater than one
+    verifies that many messages concurrently.  Verification mostly
+    waits on GnuPG subprocesses, so threads are enough to overlap
+    them.  Messages are still handled one at a time, in order.
+
     >>> from io import StringIO
     >>> from pgp_mime.email import encodedMIMEText
     >>> from .handler import InvalidMessage, Response
@@ -649,13 +686,13 @@ def mailpipe(basedir, course, stream=None, mailbox=None, input_=None,
     >>> course.cleanup()
     """
     if stream is None:
-        stream = _sys.stdin
+        stream = _sys.stdin.buffer
     for original,message,person,subject,target in _load_messages(
         course=course, stream=stream, mailbox=mailbox, input_=input_,
         output=output, dry_run=dry_run,
         continue_after_invalid_message=continue_after_invalid_message,
         trust_email_infrastructure=trust_email_infrastructure,
-        respond=respond):
+        respond=respond, jobs=jobs):
         try:
             handler = _get_handler(handlers=handlers, target=target)
             _LOG.debug('handling {}'.format(target))
@@ -668,12 +705,15 @@ def mailpipe(basedir, course, stream=None, mailbox=None, input_=None,
         except _InvalidMessage as error:
             error.course = course
             error.message = original
-            for attribute,value in [('person', person),
-                                    ('subject', subject),
-                                    ('target', target)]:
-                if (value is not None and
-                    getattr(error, attribute, None) is None):
-                    setattr(error, attribute, value)
+            if (person is not None and
+                getattr(error, 'person', None) is None):
+                error.person = person
+            if (subject is not None and
+                getattr(error, 'subject', None) is None):
+                error.subject = subject
+            if (target is not None and
+                getattr(error, 'target', None) is None):
+                error.target = target
             _LOG.warn('invalid message {}'.format(error.message_id()))
             if not continue_after_invalid_message:
                 raise
@@ -689,21 +729,8 @@ def mailpipe(basedir, course, stream=None, mailbox=None, input_=None,
                     target = person
                     msg = response.message
                     if isinstance(response.message, _MIMEText):
-                        # Manipulate body (based on pgp_mime.append_text)
-                        original_encoding = msg.get_charset().input_charset
-                        original_payload = str(
-                            msg.get_payload(decode=True), original_encoding)
-                        new_payload = (
-                            '{},\n\n'
-                            '{}\n\n'
-                            'Yours,\n'
-                            '{}\n').format(
-                            target.alias(), original_payload, author.alias())
-                        new_encoding = _pgp_mime.guess_encoding(new_payload)
-                        if msg.get('content-transfer-encoding', None):
-                            # clear CTE so set_payload will set it properly
-                            del msg['content-transfer-encoding']
-                        msg.set_payload(new_payload, new_encoding)
+                        _wrap_response_body(
+                            message=msg, target=target, author=author)
                     subject = msg['Subject']
                     assert subject is not None, msg
                     del msg['Subject']
@@ -712,63 +739,146 @@ def mailpipe(basedir, course, stream=None, mailbox=None, input_=None,
                         message=msg)
                 respond(msg)
 
+def _wrap_response_body(message, target, author):
+    """Add a greeting and signature to a ``MIMEText`` response
+
+    Based on ``pgp_mime.append_text``.
+
+    >>> from pygrader.model.person import Person
+    >>> message = _MIMEText('Your grade is 10.', 'plain', 'us-ascii')
+    >>> _wrap_response_body(
+    ...     message=message, target=Person(name='Bilbo'),
+    ...     author=Person(name='Gandalf'))
+    >>> print(message.as_string())
+    ... # doctest: +REPORT_UDIFF
+    Content-Type: text/plain; charset="us-ascii"
+    MIME-Version: 1.0
+    Content-Transfer-Encoding: 7bit
+    <BLANKLINE>
+    Bilbo,
+    <BLANKLINE>
+    Your grade is 10.
+    <BLANKLINE>
+    Yours,
+    Gandalf
+    <BLANKLINE>
+    """
+    original_encoding = message.get_charset().input_charset
+    original_payload = str(
+        message.get_payload(decode=True), original_encoding)
+    new_payload = (
+        '{},\n\n'
+        '{}\n\n'
+        'Yours,\n'
+        '{}\n').format(target.alias(), original_payload, author.alias())
+    try:  # most responses are plain ASCII
+        new_payload.encode('us-ascii')
+    except UnicodeEncodeError:
+        new_encoding = _pgp_mime.guess_encoding(new_payload)
+    else:
+        new_encoding = 'us-ascii'
+    if message.get('content-transfer-encoding', None):
+        # clear CTE so set_payload will set it properly
+        del message['content-transfer-encoding']
+    message.set_payload(new_payload, new_encoding)
+
 def _load_messages(course, stream, mailbox=None, input_=None, output=None,
                    continue_after_invalid_message=False,
                    trust_email_infrastructure=False, respond=None,
-                   dry_run=False):
+                   dry_run=False, jobs=1):
     if mailbox is None:
         _LOG.debug('loading message from {}'.format(stream))
         mbox = None
-        messages = [(None,_message_from_file(stream))]
+        if isinstance(stream, _io.TextIOBase):
+            message = _message_from_file(stream)
+        else:  # parse raw bytes without decoding them first
+            message = _message_from_binary_file(stream)
+        messages = [(None,message)]
         if output is not None:
             ombox = _mailbox.Maildir(output, factory=None, create=True)
     elif mailbox == 'mbox':
         mbox = _mailbox.mbox(input_, factory=None, create=False)
-        messages = mbox.items()
+        keys = list(mbox.iterkeys())
         if output is not None:
             ombox = _mailbox.mbox(output, factory=None, create=True)
     elif mailbox == 'maildir':
         mbox = _mailbox.Maildir(input_, factory=None, create=False)
-        messages = []
-        for key,msg in mbox.items():
+        keys = []
+        for key in mbox.iterkeys():
             subpath = mbox._lookup(key)
             if subpath.endswith('.gitignore'):
                 _LOG.debug('skipping non-message {}'.format(subpath))
                 continue
-            messages.append((key, msg))
+            keys.append(key)
         if output is not None:
             ombox = _mailbox.Maildir(output, factory=None, create=True)
     else:
         raise ValueError(mailbox)
-    messages.sort(key=_get_message_time)
-    for key,msg in messages:
+    if mbox is not None:
+        # Sort by receipt time, keeping only the times in memory, and
+        # load each message again when it is processed.
+        keys.sort(key=lambda key: _message_time(_get_headers(mbox, key)))
+        messages = ((key, mbox[key]) for key in keys)
+    def parse(key_message):
+        key,msg = key_message
         try:
-            ret = _parse_message(
-                course=course, message=msg,
-                trust_email_infrastructure=trust_email_infrastructure)
+            return (key, msg, _parse_message(
+                    course=course, message=msg,
+                    trust_email_infrastructure=trust_email_infrastructure,
+                    cache_verification=mbox is not None),
+                    None)
         except _InvalidMessage as error:
-            error.message = msg
-            _LOG.warn('invalid message {}'.format(error.message_id()))
-            if not continue_after_invalid_message:
-                raise
-            _LOG.warn('{}'.format(error))
-            if respond:
-                response = _get_error_response(error)
-                if response is not None:
-                    respond(response)
-            continue
-        if output is not None and dry_run is False:
-            # move message from input mailbox to output mailbox
-            ombox.add(msg)
-            if mbox is not None:
-                del mbox[key]
-        yield ret
-
-def _parse_message(course, message, trust_email_infrastructure=False):
+            return (key, msg, None, error)
+    if mbox is None:
+        jobs = 1
+    results = _map_jobs(parse, messages, jobs=jobs)
+    try:
+        for key,msg,ret,error in results:
+            if error is not None:
+                error.message = msg
+                _LOG.warn('invalid message {}'.format(error.message_id()))
+                if not continue_after_invalid_message:
+                    raise error
+                _LOG.warn('{}'.format(error))
+                if respond:
+                    response = _get_error_response(error)
+                    if response is not None:
+                        respond(response)
+                continue
+            if output is not None and dry_run is False:
+                # move message from input mailbox to output mailbox
+                ombox.add(msg)
+                if mbox is not None:
+                    del mbox[key]
+            yield ret
+    finally:
+        results.close()  # cancel any verifications still queued
+
+def _get_headers(mbox, key):
+    """Parse only the header block of a mailbox message
+
+    Enough for ``_message_time``, without reading or parsing the body.
+    """
+    lines = []
+    stream = mbox.get_file(key)
+    try:
+        for line in iter(stream.readline, b''):
+            if line in (b'\n', b'\r\n'):
+                break
+            lines.append(line)
+    finally:
+        stream.close()
+    return _message_from_bytes(b''.join(lines))
+
+def _parse_message(course, message, trust_email_infrastructure=False,
+                   cache_verification=False):
     """Parse an incoming email and respond if neccessary.
 
     Return ``(msg, person, assignment, time)`` on successful parsing.
     Return ``None`` on failure.
+
+    Set ``cache_verification`` when parsing a whole mailbox, where the
+    same signed message may turn up more than once.
     """
     original = message
     person = subject = target = None
@@ -777,7 +887,11 @@ def _parse_message(course, message, trust_email_infrastructure=False):
         if person.pgp_key:
             _LOG.debug('verify message is from {}'.format(person))
             try:
-                message = _get_verified_message(message, person.pgp_key)
+                if cache_verification:
+                    message = _get_cached_verified_message(
+                        message, person.pgp_key)
+                else:
+                    message = _get_verified_message(message, person.pgp_key)
             except _UnsignedMessage as error:
                 if trust_email_infrastructure:
                     _LOG.warn('{}'.format(error))
@@ -788,12 +902,15 @@ def _parse_message(course, message, trust_email_infrastructure=False):
     except _InvalidMessage as error:
         error.course = course
         error.message = original
-        for attribute,value in [('person', person),
-                                ('subject', subject),
-                                ('target', target)]:
-            if (value is not None and
-                getattr(error, attribute, None) is None):
-                setattr(error, attribute, value)
+        if (person is not None and
+            getattr(error, 'person', None) is None):
+            error.person = person
+        if (subject is not None and
+            getattr(error, 'subject', None) is None):
+            error.subject = subject
+        if (target is not None and
+            getattr(error, 'target', None) is None):
+            error.target = target
         raise
     return (original, message, person, subject, target)
 
@@ -840,13 +957,14 @@ def _get_message_person(course, message, trust_admin_from=True):
     sender = message['return-path']  # RFC 822
     if sender is None:
         raise NoReturnPath(message)
-    sender = sender[1:-1]  # strip wrapping '<' and '>'
-    people = list(course.find_people(email=sender))
-    if len(people) == 0:
+    sender = _parse_address(sender)
+    matches = list(course.find_people(email=sender))
+    if len(matches) == 0:
         raise UnregisteredAddress(message=message, address=sender)
-    if len(people) > 1:
-        raise AmbiguousAddress(message=message, address=sender, people=people)
-    person = people[0]
+    if len(matches) > 1:
+        raise AmbiguousAddress(
+            message=message, address=sender, people=matches)
+    person = matches[0]
     if trust_admin_from and person.is_admin():
         mid = message['message-id']
         from_headers = message.get_all('from')
@@ -855,18 +973,36 @@ def _get_message_person(course, message, trust_admin_from=True):
         elif len(from_headers) > 1:
             _LOG.debug("multiple 'From' headers in {}".format(mid))
         else:
-            name,address = _parseaddr(from_headers[0])
-            people = list(course.find_people(email=address))
-            if len(people) == 0:
+            address = _parse_address(from_headers[0])
+            matches = list(course.find_people(email=address))
+            if len(matches) == 0:
                 _LOG.debug("'From' address {} is unregistered".format(address))
-            if len(people) > 1:
+            if len(matches) > 1:
                 _LOG.debug("'From' address {} is ambiguous".format(address))
             _LOG.debug('message from {} treated as being from {}'.format(
-                    person, people[0]))
-            person = people[0]
+                    person, matches[0]))
+            person = matches[0]
     _LOG.debug('message from {}'.format(person))
     return person
 
+def _parse_address(value):
+    """Return the bare address from a Return-Path or From value
+
+    >>> _parse_address('<bb@shire.org>')
+    'bb@shire.org'
+    >>> _parse_address('Bilbo Baggins <bb@shire.org>')
+    'bb@shire.org'
+    >>> _parse_address('"Baggins <Bilbo>" <bb@shire.org>')
+    'bb@shire.org'
+    >>> _parse_address('bb@shire.org')
+    'bb@shire.org'
+    """
+    value = value.strip()
+    if (value.startswith('<') and value.endswith('>') and
+        '<' not in value[1:-1]):  # the usual Return-Path
+        return value[1:-1]
+    return _parseaddr(value)[1]
+
 def _get_message_subject(message):
     """
     >>> from email.header import Header
@@ -888,10 +1024,25 @@ def _get_message_subject(message):
     >>> _get_message_subject(message=message)
     'clean subject'
     """
-    if message['Subject'] is None:
+    subject = message['Subject']
+    if subject is None:
         raise SubjectlessMessage(subject=None, message=message)
+    if isinstance(subject, str):
+        return _decode_subject(subject)
+    # Header instances are unhashable, so skip the cache
+    return _decode_subject.__wrapped__(subject)
+
+@_functools.lru_cache(maxsize=1024)
+def _decode_subject(subject):
+    """Decode and normalize a raw Subject header value
 
-    parts = _decode_header(message['Subject'])
+    Mailboxes see the same subjects over and over, so remember the
+    result for each raw value.
+
+    >>> _decode_subject('=?utf-8?q?unicode_part?= -ascii part #3')
+    'unicode part -ascii part 3'
+    """
+    parts = _decode_header(subject)
     part_strings = []
     for string,encoding in parts:
         if encoding is None:
@@ -917,12 +1068,21 @@ def _get_message_target(subject):
     'abc'
     >>> _get_message_target(subject='[phys160:abc] empty tag')
     'abc'
+
+    If there are several tags, the last one wins.
+
+    >>> _get_message_target(subject='re: [phys160:submit] [phys160:get]')
+    'get'
+    >>> _get_message_target(subject='[phys160:get] [unclosed')
+    'get'
     """
-    match = _TAG_REGEXP.match(subject)
-    if match is None:
+    # the last '[' that is followed by a ']', up to the first ']' after it
+    end = subject.rfind(']')
+    start = subject.rfind('[', 0, max(end, 0))
+    if start < 0:
         raise _InvalidSubjectMessage(
             subject=subject, error='no tag in {!r}'.format(subject))
-    tag = match.group(1)
+    tag = subject[start+1:subject.index(']', start+1)]
     if tag == '':
         raise _InvalidSubjectMessage(
             subject=subject, error='empty tag in {!r}'.format(subject))
@@ -938,6 +1098,29 @@ def _get_handler(handlers, target):
             target=target, handlers=handlers) from error
     return handler
 
+@_functools.lru_cache(maxsize=32)
+def _get_handler_hint(targets):
+    """Suggest alternatives for an unmatched handler target.
+
+    ``targets`` is a frozenset of handler names, so the sorted hint
+    is only built once for each handler configuration.
+
+    >>> print(_get_handler_hint(frozenset(['submit', 'get'])))
+    Perhaps you meant to use one of the following:
+      get
+      submit
+    >>> print(_get_handler_hint(frozenset()))
+    In fact, there are no available handlers for this
+    course!
+    """
+    if not targets:
+        return (
+            'In fact, there are no available handlers for this\n'
+            'course!')
+    return (
+        'Perhaps you meant to use one of the following:\n'
+        '  {}').format('\n  '.join(sorted(targets)))
+
 def _get_verified_message(message, pgp_key):
     """
 
@@ -992,31 +1175,42 @@ def _get_verified_message(message, pgp_key):
       ...
     pygrader.handler.UnsignedMessage: unsigned message
     """
-    mid = message['message-id']
+    _check_pgp_mime(message)
     try:
         decrypted,verified,signatures = _pgp_mime.verify(message=message)
     except (ValueError, AssertionError) as error:
         raise _UnsignedMessage(message=message) from error
-    for signature in signatures:
-        _LOG.debug(signature.dumps())
-    match = None
-    fingerprints = dict((s.fingerprint, s) for s in signatures)
-    for s in signatures:
-        for key in _pgp_mime_key.lookup_keys([s.fingerprint]):
-            if key.subkeys[0].fingerprint != s.fingerprint:
-                # the signature was made with a subkey.  Add the primary.
-                fingerprints[key.subkeys[0].fingerprint] = s
+    if _LOG.isEnabledFor(_logging.DEBUG):
+        for signature in signatures:
+            _LOG.debug(signature.dumps())
     if pgp_key.startswith('0x'):
         key_tail = pgp_key[len('0x'):]
     else:
         key_tail = pgp_key
-    matches = [fingerprints[f] for f in fingerprints.keys()
-               if f.endswith(key_tail)]
-    if len(matches) == 0:
+    tail_length = len(key_tail)
+    fingerprints = dict((s.fingerprint, s) for s in signatures)
+    # usually the signature was made with the primary key itself
+    signature = next(
+        (s for f,s in fingerprints.items() if f[-tail_length:] == key_tail),
+        None)
+    if signature is None and fingerprints:
+        # the signature may have been made with a subkey.  Look up all
+        # the signing keys in a single GnuPG request and add their
+        # primaries.
+        for key in _pgp_mime_key.lookup_keys(list(fingerprints)):
+            primary = key.subkeys[0].fingerprint
+            for subkey in key.subkeys[1:]:
+                s = fingerprints.get(subkey.fingerprint, None)
+                if s is not None:
+                    fingerprints[primary] = s
+        signature = next(
+            (s for f,s in fingerprints.items()
+             if f[-tail_length:] == key_tail),
+            None)
+    if signature is None:
         raise WrongSignatureMessage(
             message=message, pgp_key=pgp_key, signatures=signatures,
             fingerprints=fingerprints, decrypted=decrypted)
-    signature = matches[0]
     if not verified:
         problems = [k for k,v in signature.summary.items() if v]
         for good in ['green', 'valid']:
@@ -1028,130 +1222,64 @@ def _get_verified_message(message, pgp_key):
         # otherwise, we may have an untrusted key.  We'll count that
         # as verified here, because the caller is explicity looking
         # for signatures by this fingerprint.
-    for k,v in message.items(): # copy over useful headers
-        if k.lower() not in ['content-type',
-                             'mime-version',
-                             'content-disposition',
-                             ]:
+    # copy over useful headers
+    for k,v in message.raw_items():
+        if k.lower() not in _SKIP_HEADERS:
             decrypted[k] = v
     decrypted.authenticated = True
     return decrypted
 
+def _check_pgp_mime(message):
+    "Raise ``UnsignedMessage`` unless `message` is PGP/MIME."
+    protocol = _PGP_MIME_PROTOCOLS.get(message.get_content_type(), None)
+    if (protocol is None or
+        str(message.get_param('protocol', '')).lower() != protocol):
+        raise _UnsignedMessage(message=message)
+
+def _get_cached_verified_message(message, pgp_key):
+    """Memoizing wrapper around ``_get_verified_message``
+
+    Only successful verifications are cached.  Hits return a copy of
+    the cached message, so callers are free to modify it.
+    """
+    _check_pgp_mime(message)  # before paying for the digest
+    try:
+        text = message.as_string()
+    except UnicodeError as error:
+        _LOG.debug('not caching verification of {} ({})'.format(
+                message['message-id'], error))
+        return _get_verified_message(message, pgp_key)
+    digest = _hashlib.sha256(
+        text.encode('utf-8', 'surrogateescape')).hexdigest()
+    key = (pgp_key, digest)
+    with _VERIFIED_CACHE_LOCK:
+        decrypted = _VERIFIED_CACHE.get(key, None)
+        if decrypted is not None:
+            _VERIFIED_CACHE.move_to_end(key)
+    if decrypted is not None:
+        _LOG.debug('using cached verification of {}'.format(
+                message['message-id']))
+        return _copy.deepcopy(decrypted)
+    decrypted = _get_verified_message(message, pgp_key)
+    with _VERIFIED_CACHE_LOCK:
+        _VERIFIED_CACHE[key] = _copy.deepcopy(decrypted)
+        while len(_VERIFIED_CACHE) > _VERIFIED_CACHE_SIZE:
+            _VERIFIED_CACHE.popitem(last=False)
+    return decrypted
+
 def _get_error_response(error):
     author = error.course.robot
-    target = getattr(error, 'person', None)
-    subject = str(error)
-    if isinstance(error, _InvalidSubmission):
-        subject = 'Received invalid {} submission'.format(
-            error.assignment.name)
-        text = (
-            'We received your submission for {}, but you are not\n'
-            'allowed to submit that assignment via email.'
-            ).format(error.assignment.name)
-    elif isinstance(error, _MissingGradeMessage):
-        subject = 'No grade in {!r}'.format(error.subject)
-        text = (
-            'Your grade submission did not include a text/plain\n'
-            'part containing the new grade and comment.'
-            )
-    elif isinstance(error, InvalidHandlerMessage):
-        targets = sorted(error.handlers.keys())
-        if not targets:
-            hint = (
-                'In fact, there are no available handlers for this\n'
-                'course!')
-        else:
-            hint = (
-                'Perhaps you meant to use one of the following:\n'
-                '  {}').format('\n  '.join(targets))
-        text = (
-            'We received an email from you with the following subject:\n'
-            '  {!r}\n'
-            'which does not match any submittable handler name for\n'
-            '{}.\n'
-            '{}').format(error.subject, error.course.name, hint)
-    elif isinstance(error, SubjectlessMessage):
-        subject = 'no subject in {}'.format(error.message['Message-ID'])
-        text = 'We received an email message from you without a subject.'
-    elif isinstance(error, AmbiguousAddress):
-        text = (
-            'Multiple people match {} ({})'.format(
-                error.address, ', '.join(p.name for p in error.people)))
-    elif isinstance(error, UnregisteredAddress):
-        target = _Person(name=error.address, emails=[error.address])
-        text = (
-            'Your email address is not registered with pygrader for\n'
-            '{}.  If you feel it should be, contact your professor\n'
-            'or TA.').format(error.course.name)
-    elif isinstance(error, NoReturnPath):
-        return
-    elif isinstance(error, _InvalidAssignmentSubject):
-        if error.assignments:
-            hint = (
-                'but it matches several assignments:\n'
-                '  * {}').format('\n  * '.join(
-                    a.name for a in error.assignments))
-        else:
-            # prefer a submittable example assignment
-            assignments = [
-                a for a in error.course.assignments if a.submittable]
-            assignments += error.course.assignments  # but fall back to any one
-            hint = (
-                'Remember to use the full name for the assignment in the\n'
-                'subject.  For example:\n'
-                '  {} submission').format(assignments[0].name)
-        text = (
-            'We received an email from you with the following subject:\n'
-            '  {!r}\n{}').format(error.subject, hint)
-    elif isinstance(error, _InvalidStudentSubject):
-        text = (
-            'We received an email from you with the following subject:\n'
-            '  {!r}\n'
-            'but it matches several students:\n'
-            '  * {}').format(
-            error.subject, '\n  * '.join(s.name for s in error.students))
-    elif isinstance(error, _InvalidSubjectMessage):
-        text = (
-            'We received an email message from you with an invalid\n'
-            'subject.')
-    elif isinstance(error, _UnsignedMessage):
-        subject = 'unsigned message {}'.format(error.message['Message-ID'])
-        text = (
-            'We received an email message from you without a PGP\n'
-            'signature.'
-            )
-    elif isinstance(error, WrongSignatureMessage):
-        lines = [
-            'We received an email message from you without a valid',
-            'PGP signature.  We were expecting a signature by',
-            '{}, but got signatures by:'.format(error.person.pgp_key),
-            ]
-        lines.extend(['  {}'.format(s.fingerprint) for s in error.signatures])
-        text = '\n'.join(lines)
-    elif isinstance(error, UnverifiedSignatureMessage):
-        text = (
-            'We received an email message from you with an unverified\n'
-            'signature:\n\n'
-            '{}\n\n'
-            'If this is the key you intended to use, contact your\n'
-            'professor or TA.'
-            ).format(error.signature.dumps(prefix='  '))
-    elif isinstance(error, _PermissionViolationMessage):
-        text = (
-            'We received an email from you with the following subject:\n'
-            '  {!r}\n'
-            "but you can't do that unless you belong to one of the\n"
-            'following groups:\n'
-            '  * {}').format(
-            error.subject, '\n  * '.join(error.allowed_groups))
-    elif isinstance(error, _InvalidMessage):
-        text = (
-            'We received an email from you with the following subject:\n'
-            '  {!r}\n'
-            'but the message was invalid:\n'
-            '  {}').format(error.subject, error)
+    for cls in type(error).__mro__:
+        builder = _ERROR_RESPONSE_BUILDERS.get(cls, None)
+        if builder is not None:
+            break
     else:
         raise NotImplementedError((type(error), error))
+    ret = builder(
+        error=error, subject=str(error), target=getattr(error, 'person', None))
+    if ret is None:
+        return
+    subject,target,text = ret
     if target is None:
         raise NotImplementedError((type(error), error))
     return _construct_response(
@@ -1165,7 +1293,152 @@ def _get_error_response(error):
             '{}\n'.format(target.alias(), text, author.alias())),
         original=error.message)
 
-def _get_message_time(key_message):
-    "Key function for sorting mailbox (key,message) tuples."
-    key,message = key_message
-    return _message_time(message)
+def _invalid_submission_response(error, subject, target):
+    subject = 'Received invalid {} submission'.format(
+        error.assignment.name)
+    text = (
+        'We received your submission for {}, but you are not\n'
+        'allowed to submit that assignment via email.'
+        ).format(error.assignment.name)
+    return (subject, target, text)
+
+def _missing_grade_response(error, subject, target):
+    subject = 'No grade in {!r}'.format(error.subject)
+    text = (
+        'Your grade submission did not include a text/plain\n'
+        'part containing the new grade and comment.'
+        )
+    return (subject, target, text)
+
+def _invalid_handler_response(error, subject, target):
+    hint = _get_handler_hint(frozenset(error.handlers))
+    text = (
+        'We received an email from you with the following subject:\n'
+        '  {!r}\n'
+        'which does not match any submittable handler name for\n'
+        '{}.\n'
+        '{}').format(error.subject, error.course.name, hint)
+    return (subject, target, text)
+
+def _subjectless_response(error, subject, target):
+    subject = 'no subject in {}'.format(error.message['Message-ID'])
+    text = 'We received an email message from you without a subject.'
+    return (subject, target, text)
+
+def _ambiguous_address_response(error, subject, target):
+    text = (
+        'Multiple people match {} ({})'.format(
+            error.address, ', '.join(p.name for p in error.people)))
+    return (subject, target, text)
+
+def _unregistered_address_response(error, subject, target):
+    target = _Person(name=error.address, emails=[error.address])
+    text = (
+        'Your email address is not registered with pygrader for\n'
+        '{}.  If you feel it should be, contact your professor\n'
+        'or TA.').format(error.course.name)
+    return (subject, target, text)
+
+def _no_return_path_response(error, subject, target):
+    return
+
+def _invalid_assignment_subject_response(error, subject, target):
+    if error.assignments:
+        hint = (
+            'but it matches several assignments:\n'
+            '  * {}').format('\n  * '.join(
+                a.name for a in error.assignments))
+    else:
+        # prefer a submittable example assignment
+        assignments = [
+            a for a in error.course.assignments if a.submittable]
+        assignments += error.course.assignments  # but fall back to any one
+        hint = (
+            'Remember to use the full name for the assignment in the\n'
+            'subject.  For example:\n'
+            '  {} submission').format(assignments[0].name)
+    text = (
+        'We received an email from you with the following subject:\n'
+        '  {!r}\n{}').format(error.subject, hint)
+    return (subject, target, text)
+
+def _invalid_student_subject_response(error, subject, target):
+    text = (
+        'We received an email from you with the following subject:\n'
+        '  {!r}\n'
+        'but it matches several students:\n'
+        '  * {}').format(
+        error.subject, '\n  * '.join(s.name for s in error.students))
+    return (subject, target, text)
+
+def _invalid_subject_response(error, subject, target):
+    text = (
+        'We received an email message from you with an invalid\n'
+        'subject.')
+    return (subject, target, text)
+
+def _unsigned_response(error, subject, target):
+    subject = 'unsigned message {}'.format(error.message['Message-ID'])
+    text = (
+        'We received an email message from you without a PGP\n'
+        'signature.'
+        )
+    return (subject, target, text)
+
+def _wrong_signature_response(error, subject, target):
+    lines = [
+        'We received an email message from you without a valid',
+        'PGP signature.  We were expecting a signature by',
+        '{}, but got signatures by:'.format(error.person.pgp_key),
+        ]
+    lines.extend(['  {}'.format(s.fingerprint) for s in error.signatures])
+    text = '\n'.join(lines)
+    return (subject, target, text)
+
+def _unverified_signature_response(error, subject, target):
+    text = (
+        'We received an email message from you with an unverified\n'
+        'signature:\n\n'
+        '{}\n\n'
+        'If this is the key you intended to use, contact your\n'
+        'professor or TA.'
+        ).format(error.signature.dumps(prefix='  '))
+    return (subject, target, text)
+
+def _permission_violation_response(error, subject, target):
+    text = (
+        'We received an email from you with the following subject:\n'
+        '  {!r}\n'
+        "but you can't do that unless you belong to one of the\n"
+        'following groups:\n'
+        '  * {}').format(
+        error.subject, '\n  * '.join(error.allowed_groups))
+    return (subject, target, text)
+
+def _invalid_message_response(error, subject, target):
+    text = (
+        'We received an email from you with the following subject:\n'
+        '  {!r}\n'
+        'but the message was invalid:\n'
+        '  {}').format(error.subject, error)
+    return (subject, target, text)
+
+# Response builders for each error type.  _get_error_response uses
+# the entry for the most specific class in the error's MRO.
+_ERROR_RESPONSE_BUILDERS = {
+    _InvalidSubmission: _invalid_submission_response,
+    _MissingGradeMessage: _missing_grade_response,
+    InvalidHandlerMessage: _invalid_handler_response,
+    SubjectlessMessage: _subjectless_response,
+    AmbiguousAddress: _ambiguous_address_response,
+    UnregisteredAddress: _unregistered_address_response,
+    NoReturnPath: _no_return_path_response,
+    _InvalidAssignmentSubject: _invalid_assignment_subject_response,
+    _InvalidStudentSubject: _invalid_student_subject_response,
+    _InvalidSubjectMessage: _invalid_subject_response,
+    _UnsignedMessage: _unsigned_response,
+    WrongSignatureMessage: _wrong_signature_response,
+    UnverifiedSignatureMessage: _unverified_signature_response,
+    _PermissionViolationMessage: _permission_violation_response,
+    _InvalidMessage: _invalid_message_response,
+    }
@@ -15,6 +15,8 @@
 # pygrader.  If not, see <http://www.gnu.org/licenses/>.
 
 class Assignment (object):
+    __slots__ = ('name', 'points', 'weight', 'due', 'submittable')
+
     def __init__(self, name, points=1, weight=0, due=0, submittable=True):
         self.name = name
         self.points = points
@@ -26,8 +28,4 @@ class Assignment (object):
         return '<{} {}>'.format(type(self).__name__, self.name)
 
     def __lt__(self, other):
-        if self.due < other.due:
-            return True
-        elif other.due < self.due:
-            return False
-        return self.name < other.name
+        return (self.due, self.name) < (other.due, other.name)
@@ -18,25 +18,51 @@ from .. import LOG as _LOG
 
 
 class Course (object):
+    __slots__ = ('name', 'assignments', '_assignments_by_name', 'people',
+                 '_people_by_name', '_people_by_email', '_people_by_group',
+                 'grades', '_grades_by_key', '_grades_indexed', 'robot')
+
     def __init__(self, name=None, assignments=None, people=None, grades=None,
                  robot=None):
         self.name = name
         if assignments is None:
             assignments = []
-        self.assignments = sorted(assignments)
+        # sort on tuple keys (matching the models' __lt__) to avoid
+        # calling back into Python for every comparison
+        self.assignments = sorted(
+            assignments, key=lambda a: (a.due, a.name))
+        self._assignments_by_name = {}
+        for assignment in self.assignments:
+            self._assignments_by_name.setdefault(assignment.name, assignment)
         if people is None:
             people = []
-        self.people = sorted(people)
+        self.people = sorted(people, key=lambda p: p.name)
+        self._people_by_name = {}
+        self._people_by_email = {}
+        self._people_by_group = {}
+        for person in self.people:
+            for index,keys in [
+                    (self._people_by_name,
+                     set([person.name] + list(person.aliases or []))),
+                    (self._people_by_email, set(person.emails)),
+                    (self._people_by_group, set(person.groups)),
+                    ]:
+                for key in keys:
+                    index.setdefault(key, []).append(person)
         if grades is None:
             grades = []
-        self.grades = sorted(grades)
+        self.grades = sorted(
+            grades, key=lambda g: (
+                g.student.name, g.assignment.due, g.assignment.name))
+        self._grades_by_key = None  # built on demand by grade()
+        self._grades_indexed = 0
         self.robot = robot
 
     def assignment(self, name):
-        for assignment in self.assignments:
-            if assignment.name == name:
-                return assignment
-        raise ValueError(name)
+        try:
+            return self._assignments_by_name[name]
+        except KeyError as error:
+            raise ValueError(name) from error
 
     def active_assignments(self):
         return sorted(set(grade.assignment for grade in self.grades))
@@ -79,7 +105,22 @@ class Course (object):
         <Person Bilbo Baggins>
         <Person Frodo Baggins>
         """
-        for person in self.people:
+        filters = [(key,index) for key,index in [
+                (name, self._people_by_name),
+                (email, self._people_by_email),
+                (group, self._people_by_group),
+                ] if key is not None]
+        if not filters:
+            return iter(self.people)
+        # only consider people matching the most selective filter
+        people = min((index.get(key, []) for key,index in filters), key=len)
+        if len(filters) == 1:
+            return iter(people)  # the index entry is the whole answer
+        return self._filter_people(
+            people=people, name=name, email=email, group=group)
+
+    def _filter_people(self, people, name=None, email=None, group=None):
+        for person in people:
             name_match = (person.name == name or
                           (person.aliases and name in person.aliases))
             email_match = email in person.emails
@@ -113,17 +154,45 @@ class Course (object):
         >>> print(c.grade(student=p, assignment=a))
         <Grade Bilbo Baggins:Exam 1>
         """
-        for grade in self.grades:
-            if grade.student == student and grade.assignment == assignment:
-                return grade
-        raise ValueError((student, assignment))
+        try:
+            return self._grade_index()[(student, assignment)]
+        except KeyError as error:
+            raise ValueError((student, assignment)) from error
+
+    def _grade_index(self):
+        """Return a ``{(student, assignment): grade}`` dict
+
+        The index is rebuilt if grades have been appended since it was
+        last built.
+        """
+        if (self._grades_by_key is None or
+            self._grades_indexed != len(self.grades)):
+            self._grades_by_key = {}
+            for grade in self.grades:
+                self._grades_by_key.setdefault(
+                    (grade.student, grade.assignment), grade)
+            self._grades_indexed = len(self.grades)
+        return self._grades_by_key
 
     def total(self, student):
+        """Return the weighted total of ``student``'s grades
+
+        >>> from pygrader.model.assignment import Assignment
+        >>> from pygrader.model.grade import Grade
+        >>> from pygrader.model.person import Person
+        >>> p = Person(name='Bilbo Baggins')
+        >>> a1 = Assignment(name='Exam 1', points=10, weight=0.4)
+        >>> a2 = Assignment(name='Exam 2', points=20, weight=0.6)
+        >>> g = Grade(student=p, assignment=a1, points=5)
+        >>> c = Course(assignments=[a1, a2], people=[p], grades=[g])
+        >>> c.total(p)
+        0.2
+        """
+        grades = self._grade_index()
         total = 0
         for assignment in self.assignments:
-            try:
-                grade = self.grade(student=student, assignment=assignment)
-            except ValueError:
-                continue
+            grade = grades.get((student, assignment), None)
+            if grade is None:
+                continue  # ungraded assignments don't count
             total += float(grade.points)/assignment.points * assignment.weight
         return total
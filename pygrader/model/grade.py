@@ -15,6 +15,9 @@
 # pygrader.  If not, see <http://www.gnu.org/licenses/>.
 
 class Grade (object):
+    __slots__ = ('student', 'assignment', 'points', 'comment', 'late',
+                 'notified')
+
     def __init__(self, student, assignment, points, comment=None,
                  late=False, notified=False):
         self.student = student
@@ -29,8 +32,6 @@ class Grade (object):
             type(self).__name__, self.student.name, self.assignment.name)
 
     def __lt__(self, other):
-        if self.student < other.student:
-            return True
-        elif other.student < self.student:
-            return False
-        return self.assignment < other.assignment
+        return (
+            (self.student.name, self.assignment.due, self.assignment.name) <
+            (other.student.name, other.assignment.due, other.assignment.name))
@@ -15,7 +15,9 @@
 # pygrader.  If not, see <http://www.gnu.org/licenses/>.
 
 class Person (object):
+    __slots__ = ('name', 'emails', 'pgp_key', 'aliases', 'groups')
     admin_groups = ['professors', 'assistants']
+    _admin_groups = frozenset(admin_groups)  # for quick membership tests
 
     def __init__(self, name, emails=None, pgp_key=None, aliases=None,
                  groups=None):
@@ -40,15 +42,11 @@ class Person (object):
     def alias(self):
         """Return a good alias for direct address
         """
-        try:
+        if self.aliases:
             return self.aliases[0]
-        except KeyError:
-            return self.name
+        return self.name
 
     def is_admin(self):
         """Is this person an administrator for this course? True/False.
         """
-        for group in self.admin_groups:
-            if group in self.groups:
-                return True
-        return False
+        return not self._admin_groups.isdisjoint(self.groups)
@@ -18,7 +18,9 @@ from __future__ import absolute_import
 
 import calendar as _calendar
 import configparser as _configparser
+import datetime as _datetime
 import email.utils as _email_utils
+import functools as _functools
 import io as _io
 import os as _os
 import os.path as _os_path
@@ -28,19 +30,36 @@ import time as _time
 
 import pygrader as _pygrader
 from . import LOG as _LOG
+from . import map_jobs as _map_jobs
 from .model.assignment import Assignment as _Assignment
 from .model.course import Course as _Course
 from .model.grade import Grade as _Grade
 from .model.person import Person as _Person
-from .todo import newer
 
 
-_DATE_REGEXP = _re.compile('^([^T]*)(T?)([^TZ+-.]*)([.]?[0-9]*)([+-][0-9:]*|Z?)$')
-
-
-def load_course(basedir):
+_DATE_REGEXP = _re.compile(
+    r'^([0-9]{4}(?:-[0-9]{1,2}(?:-[0-9]{1,2})?)?)'  # date
+    r'(?:(T)([0-9]{1,2}:[0-9]{1,2}(?::[0-9]{1,2})?)'  # time
+    r'([.][0-9]+)?(Z|[+-][0-9]{2}:[0-9]{2})?)?$')  # fraction and zone
+# pad truncated W3C DTF dates out to something fromisoformat accepts
+_DATE_PADDING = {4: '-01-01', 7: '-01'}
+# strptime formats keyed by the number of '-' and ':' separators
+_DATE_FORMATS = {
+    (2, 2): '%Y-%m-%dT%H:%M:%S',
+    (2, 1): '%Y-%m-%dT%H:%M',
+    (2, 0): '%Y-%m-%d',
+    (1, 0): '%Y-%m',
+    (0, 0): '%Y',
+    }
+_FILESYSTEM_NAME_TABLE = str.maketrans(
+    {' ': '_', '.': None, "'": None, '"': None})
+
+
+def load_course(basedir, jobs=1):
     """Load a course directory.
 
+    ``jobs`` is passed through to `load_grades`.
+
     >>> from pygrader.test.course import StubCourse
     >>> stub_course = StubCourse(load=False)
     >>> course = load_course(basedir=stub_course.basedir)
@@ -57,22 +76,20 @@ def load_course(basedir):
     >>> stub_course.cleanup()
     """
     _LOG.debug('loading course from {}'.format(basedir))
-    config = _configparser.ConfigParser()
-    config.read([_os_path.join(basedir, 'course.conf')],
-                encoding=_pygrader.ENCODING)
-    name = config.get('course', 'name')
-    names = {'robot': [config.get('course', 'robot').strip()]}
+    sections = _load_config(_os_path.join(basedir, 'course.conf'))
+    course = _config_section(sections, 'course')
+    name = course['name']
+    names = {'robot': [course['robot'].strip()]}
     for option in ['assignments', 'professors', 'assistants', 'students']:
         names[option] = [
-            a.strip() for a in
-            config.get('course', option, fallback='').split(',')]
+            a.strip() for a in course.get(option, '').split(',')]
         while '' in names[option]:
             names[option].remove('')
     assignments = []
     for assignment in names['assignments']:
         _LOG.debug('loading assignment {}'.format(assignment))
         assignments.append(load_assignment(
-                name=assignment, data=dict(config.items(assignment))))
+                name=assignment, data=_config_section(sections, assignment)))
     people = {}
     for group in ['robot', 'professors', 'assistants', 'students']:
         for person in names[group]:
@@ -84,15 +101,39 @@ def load_course(basedir):
                 _LOG.debug('loading person {} in group {}'.format(
                         person, group))
                 people[person] = load_person(
-                    name=person, data=dict(config.items(person)))
+                    name=person,
+                    data=_config_section(sections, person))
                 people[person].groups = [group]
-    people = people.values()
-    robot = [p for p in people if 'robot' in p.groups][0]
-    grades = list(load_grades(basedir, assignments, people))
+    robot = people[names['robot'][0]]
+    people = list(people.values())
+    grades = list(load_grades(basedir, assignments, people, jobs=jobs))
     return _Course(
         name=name, assignments=assignments, people=people, grades=grades,
         robot=robot)
 
+def _load_config(path):
+    """Load an INI file into a ``{section: {option: value}}`` mapping.
+    """
+    config = _configparser.ConfigParser()
+    config.read([path], encoding=_pygrader.ENCODING)
+    return dict(
+        (section, dict(config.items(section)))
+        for section in config.sections())
+
+def _config_section(sections, name):
+    """Look up a section, raising ``NoSectionError`` if it is missing.
+
+    >>> _config_section({}, 'course')
+    Traceback (most recent call last):
+      ...
+    configparser.NoSectionError: No section: 'course'
+    """
+    try:
+        return sections[name]
+    except KeyError:
+        raise _configparser.NoSectionError(name) from None
+
+@_functools.lru_cache(1024)
 def parse_date(string):
     """Parse dates given using the W3C DTF profile of ISO 8601.
 
@@ -144,37 +185,51 @@ def parse_date(string):
     'Sat, 05 Nov 1994 08:15:30 -0500'
     >>> p - parse_date('1994-11-05T13:15:30Z')
     0
+    >>> parse_date('1994-11-05T')
+    Traceback (most recent call last):
+      ...
+    ValueError: 1994-11-05T
     """
     m = _DATE_REGEXP.match(string)
     if not m:
         raise ValueError(string)
     date,t,time,ms,zone = m.groups()
-    ret = None
     if t:
         date += 'T' + time
-    error = None
-    for fmt in ['%Y-%m-%dT%H:%M:%S',
-                '%Y-%m-%dT%H:%M',
-                '%Y-%m-%d',
-                '%Y-%m',
-                '%Y',
-                ]:
-        try:
-            ret = _time.strptime(date, fmt)
-        except ValueError as e:
-            error = e
-        else:
-            break
-    if ret is None:
-        raise error
-    ret = list(ret)
-    ret[-1] = 0  # don't use daylight savings time
-    ret = _calendar.timegm(ret)
+    iso = date + _DATE_PADDING.get(len(date), '')
+    if zone == 'Z':
+        iso += '+00:00'
+    elif zone:
+        iso += zone
+    try:
+        ret = _datetime.datetime.fromisoformat(iso)
+    except ValueError:
+        ret = _strptime_date(date=date, zone=zone)
+    else:
+        ret = _calendar.timegm(ret.utctimetuple())
     if ms:
         ret += float(ms)
+    return ret
+
+def _strptime_date(date, zone):
+    """Fallback for dates that are too sloppy for ``fromisoformat``.
+
+    >>> _strptime_date(date='2000-2-12T6:05', zone='-05:30')
+    950355300
+    >>> _strptime_date(date='2000-02-12T01:05', zone='')
+    950317500
+    >>> _strptime_date(date='2000-02-12-01', zone='')
+    Traceback (most recent call last):
+      ...
+    ValueError: 2000-02-12-01
+    """
+    fmt = _DATE_FORMATS.get((date.count('-'), date.count(':')))
+    if fmt is None:
+        raise ValueError(date)
+    ret = _calendar.timegm(_time.strptime(date, fmt))
     if zone and zone != 'Z':
-        sign = int(zone[1] + '1')
-        hour,minute = map(int, zone.split(':', 1))
+        sign = -1 if zone[0] == '-' else 1
+        hour,minute = map(int, zone[1:].split(':', 1))
         offset = sign*(3600*hour + 60*minute)
         ret -= offset
     return ret
@@ -284,41 +339,68 @@ def load_person(name, data={}):
         kwargs['pgp_key'] = pgp_key
     return _Person(name=name, **kwargs)
 
-def load_grades(basedir, assignments, people):
-    "Load all grades in a course directory."
-    for assignment in assignments:
-        for person in people:
-            if 'students' in person.groups:
-                try:
-                    yield load_grade(basedir, assignment, person)
-                except IOError:
-                    continue
+def load_grades(basedir, assignments, people, jobs=1):
+    """Load all grades in a course directory.
+
+    ``jobs`` is passed through to `pygrader.map_jobs`, so grade
+    directories can be read concurrently.  Grades are still yielded in
+    order.
+    """
+    def load(args):
+        try:
+            return _load_grade(*args)
+        except IOError:
+            return None
+    students = [
+        (person, _os_path.join(basedir, _filesystem_name(person.name)))
+        for person in people if 'students' in person.groups]
+    args = [(_os_path.join(person_dir, _filesystem_name(assignment.name)),
+             assignment, person)
+            for assignment in assignments
+            for person,person_dir in students]
+    grades = _map_jobs(load, args, jobs=jobs)
+    try:
+        for grade in grades:
+            if grade is not None:
+                yield grade
+    finally:
+        grades.close()
 
 def load_grade(basedir, assignment, person):
     "Load a single grade from a course directory."
+    return _load_grade(
+        assignment_path(basedir, assignment, person), assignment, person)
+
+def _load_grade(path, assignment, person):
+    "Load a single grade from its assignment directory."
     _LOG.debug('loading {} grade for {}'.format(assignment, person))
-    path = assignment_path(basedir, assignment, person)
+    # one directory listing instead of an exists() per marker file
+    with _os.scandir(path) as entries:
+        entries = dict((entry.name, entry) for entry in entries)
     gpath = _os_path.join(path, 'grade')
-    g = parse_grade(_io.open(gpath, 'r', encoding=_pygrader.ENCODING),
-                    assignment, person)
+    with _io.open(gpath, 'r', encoding=_pygrader.ENCODING) as f:
+        g = parse_grade(f, assignment, person)
     #g.late = _os.stat(gpath).st_mtime > assignment.due
-    g.late = _os_path.exists(_os_path.join(path, 'late'))
-    npath = _os_path.join(path, 'notified')
-    if _os_path.exists(npath):
-        g.notified = newer(npath, gpath)
-    else:
+    g.late = 'late' in entries
+    notified = entries.get('notified')
+    if notified is None:
         g.notified = False
+    else:
+        # integer nanoseconds, as in todo.newer
+        g.notified = (
+            notified.stat().st_mtime_ns > entries['grade'].stat().st_mtime_ns)
     return g
 
 def parse_grade(stream, assignment, person):
     "Parse the points and comment from a grade stream."
+    points,_,comment = stream.read().partition('\n')
     try:
-        points = float(stream.readline())
+        points = float(points)
     except ValueError:
         _sys.stderr.write('failure reading {}, {}\n'.format(
                 assignment.name, person.name))
         raise
-    comment = stream.read().strip() or None
+    comment = comment.strip() or None
     return _Grade(
         student=person, assignment=assignment, points=points, comment=comment)
 
@@ -327,10 +409,13 @@ def assignment_path(basedir, assignment, person):
                   _filesystem_name(person.name),
                   _filesystem_name(assignment.name))
 
+@_functools.lru_cache(4096)
 def _filesystem_name(name):
-    for a,b in [(' ', '_'), ('.', ''), ("'", ''), ('"', '')]:
-        name = name.replace(a, b)
-    return name
+    """
+    >>> print(_filesystem_name('Frodo "Mr. Underhill" Baggins'))
+    Frodo_Mr_Underhill_Baggins
+    """
+    return name.translate(_FILESYSTEM_NAME_TABLE)
 
 def set_notified(basedir, grade):
     """Mark `grade.student` as notified about `grade`
@@ -350,16 +435,15 @@ def save_grade(basedir, grade):
     "Save a grade into a course directory"
     path = assignment_path(
         basedir=basedir, assignment=grade.assignment, person=grade.student)
-    if not _os_path.isdir(path):
-        _os.makedirs(path)
+    _os.makedirs(path, exist_ok=True)
     gpath = _os_path.join(path, 'grade')
     with _io.open(gpath, 'w', encoding=_pygrader.ENCODING) as f:
         f.write('{}\n'.format(grade.points))
         if grade.comment:
             f.write('\n{}\n'.format(grade.comment.strip()))
-    set_notified(basedir=basedir, grade=grade)
-    set_late(
-        basedir=basedir, assignment=grade.assignment, person=grade.student)
+    # same as set_notified() and set_late(), without recomputing `path`
+    for marker in ['notified', 'late']:
+        _touch(_os_path.join(path, marker))
 
 def _touch(path):
     """Touch a file (`path` is created if it doesn't already exist)
@@ -381,16 +465,20 @@ def _touch(path):
     >>> unlink(p)
     >>> rmdir(d)
     """
-    with open(path, 'a') as f:
-        pass
-    _os.utime(path, None)
+    try:
+        _os.utime(path, None)
+    except FileNotFoundError:
+        with open(path, 'a') as f:
+            pass
 
 def initialize(basedir, course, dry_run=False, **kwargs):
     """Stub out the directory tree based on the course configuration.
     """
     for person in course.people:
+        person_dir = _os_path.join(basedir, _filesystem_name(person.name))
         for assignment in course.assignments:
-            path = assignment_path(basedir, assignment, person)
+            path = _os_path.join(
+                person_dir, _filesystem_name(assignment.name))
             if dry_run:  # we'll need to guess if mkdirs would work
                 if not _os_path.exists(path):
                     _LOG.debug('creating {}'.format(path))
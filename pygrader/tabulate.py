@@ -25,8 +25,8 @@ except ImportError as e:
     _numpy_import_error = e
 
 from . import LOG as _LOG
+from .color import color_string as _color_string
 from .color import standard_colors as _standard_colors
-from .color import write_color as _write_color
 
 
 def _mean(iterable):  # missing-numpy workaround
@@ -49,84 +49,113 @@ def _std(iterable):  # missing-numpy workaround
     return _math.sqrt(sum((x-m)**2 for x in iterable) / length)
 
 if _numpy is None:
-    _statistics_container = list
-else:
-    _statistics_container = _numpy.array
+    _STATISTICS = {'Mean': _mean, 'Std. Dev.': _std}
+else:  # the NaN-aware versions skip _column_statistics' padding
+    _STATISTICS = {'Mean': _numpy.nanmean, 'Std. Dev.': _numpy.nanstd}
 
-def _statistic(iterable, statistic):
-    """Calculate statistics on an list of numbers
+def _column_statistics(columns, statistic):
+    """Calculate a statistic for each list of numbers in `columns`
+
+    With NumPy the columns are packed into a single NaN-padded matrix,
+    so each statistic is one vectorized call.
+
+    >>> values = _column_statistics([[0, 1, 2], [4], [1, 3]], 'Mean')
+    >>> print([float(x) for x in values])
+    [1.0, 4.0, 2.0]
+    >>> values = _column_statistics([[0, 1, 2], [4], [1, 3]], 'Std. Dev.')
+    >>> print([round(float(x), 3) for x in values])
+    [0.816, 0.0, 1.0]
     """
     global _numpy_import_error
-    if _numpy_import_error:
-        assert _numpy_import_error is not None
-        _LOG.warning('error importing numpy, falling back to workarounds')
-        _LOG.warning(str(_numpy_import_error))
-        _numpy_import_error = None
-    if statistic == 'Mean':
-        if _numpy is None:  # work around missing numpy
-            return _mean(iterable)
-        else:
-            return gs.mean()
-    elif statistic == 'Std. Dev.':
-        if _numpy is None:  # work around missing numpy
-            return _std(iterable)
-        else:
-            return gs.std()
-    else:
+    try:
+        function = _STATISTICS[statistic]
+    except KeyError:
         raise NotImplementedError(statistic)
+    if _numpy is None:
+        if _numpy_import_error is not None:
+            _LOG.warning('error importing numpy, falling back to workarounds')
+            _LOG.warning(str(_numpy_import_error))
+            _numpy_import_error = None
+        return [function(column) for column in columns]
+    width = max(len(column) for column in columns) if columns else 0
+    matrix = _numpy.full((len(columns), width), _numpy.nan)
+    for row,column in zip(matrix, columns):
+        row[:len(column)] = column
+    return function(matrix, axis=1)
 
 def tabulate(course, statistics=False, stream=None, use_color=None, **kwargs):
     """Return a table of student's grades to date
     """
     if stream is None:
         stream = _sys.stdout
+    stream.write(render_table(
+            course=course, statistics=statistics, use_color=use_color))
+    stream.flush()
+
+def render_table(course, statistics=False, use_color=None):
+    """Render `tabulate`'s table as a string
+    """
+    parts = []
     highlight,lowlight,good,bad = _standard_colors(use_color=use_color)
     colors = [highlight, lowlight]
-    assignments = sorted(set(
-            grade.assignment for grade in course.grades))
-    students = sorted(set(grade.student for grade in course.grades))
-    _write_color(string='Student', color=colors[0], stream=stream)
-    for i,assignment in enumerate(assignments):
-        string = '\t{}'.format(assignment.name)
-        color = colors[(i+1)%len(colors)]
-        _write_color(string=string, color=color, stream=stream)
+    if any(colors):
+        def add(string, color):
+            parts.append(_color_string(string=string, color=color))
+    else:  # skip the escape-sequence bookkeeping
+        def add(string, color):
+            parts.append(string)
+    graded = set()
+    grades = {}
+    points = {}
+    for grade in course.grades:
+        graded.add(grade.student)
+        # the first match wins, like Course.grade
+        grades.setdefault((grade.student, grade.assignment), grade)
+        points.setdefault(grade.assignment, []).append(grade.points)
+    # Course keeps these lists sorted, so filter them instead of sorting
+    assignments = [a for a in course.assignments if a in points]
+    if len(assignments) != len(points):  # grades for unlisted assignments
+        assignments = sorted(points)
+    students = [s for s in course.people if s in graded]
+    if len(students) != len(graded):
+        students = sorted(graded)
     if len(assignments) == len(course.assignments):
-        string = '\t{}'.format('Total')
-        color = colors[(i+2)%len(colors)]
-        _write_color(string=string, color=color, stream=stream)
-    _write_color(string='\n', stream=stream)
+        totals = dict((s, course.total(s)) for s in students)
+    else:
+        totals = None
+    # alternate colors across the columns, with the Total column last
+    column_colors = [
+        colors[(i+1)%len(colors)] for i in range(len(assignments) + 1)]
+    total_color = column_colors.pop()
+    add(string='Student', color=colors[0])
+    for assignment,color in zip(assignments, column_colors):
+        add(string='\t' + assignment.name, color=color)
+    if totals is not None:
+        add(string='\tTotal', color=total_color)
+    parts.append('\n')
     for student in students:
-        _write_color(string=student.name, color=colors[0], stream=stream)
-        for i,assignment in enumerate(assignments):
-            try:
-                grade = course.grade(student=student, assignment=assignment)
-                gs = str(grade.points)
-            except ValueError:
+        add(string=student.name, color=colors[0])
+        for assignment,color in zip(assignments, column_colors):
+            grade = grades.get((student, assignment))
+            if grade is None:
                 gs = '-'
-            string = '\t{}'.format(gs)
-            color = colors[(i+1)%len(colors)]
-            _write_color(string=string, color=color, stream=stream)
-        if len(assignments) == len(course.assignments):
-            string = '\t{}'.format(course.total(student))
-            color = colors[(i+2)%len(colors)]
-            _write_color(string=string, color=color, stream=stream)
-        _write_color(string='\n', stream=stream)
+            else:
+                gs = str(grade.points)
+            add(string='\t' + gs, color=color)
+        if totals is not None:
+            add(string='\t' + str(totals[student]), color=total_color)
+        parts.append('\n')
     if statistics:
-        _write_color(string='--\n', stream=stream)
+        columns = [points[assignment] for assignment in assignments]
+        if totals is not None:
+            columns.append([totals[s] for s in students])
+        parts.append('--\n')
         for stat in ['Mean', 'Std. Dev.']:
-            _write_color(string=stat, color=colors[0], stream=stream)
-            for i,assignment in enumerate(assignments):
-                color = colors[(i+1)%len(colors)]
-                grades = [g for g in course.grades
-                          if g.assignment == assignment]
-                gs = _statistics_container([g.points for g in grades])
-                sval = _statistic(gs, statistic=stat)
-                string = '\t{:.2f}'.format(sval)
-                _write_color(string=string, color=color, stream=stream)
-            if len(assignments) == len(course.assignments):
-                gs = _statistics_container([course.total(s) for s in students])
-                sval = _statistic(gs, statistic=stat)
-                string = '\t{}'.format(sval)
-                color = colors[(i+2)%len(colors)]
-                _write_color(string=string, color=color, stream=stream)
-            _write_color(string='\n', stream=stream)
+            values = _column_statistics(columns, statistic=stat)
+            add(string=stat, color=colors[0])
+            for value,color in zip(values, column_colors):
+                add(string='\t' + format(value, '.2f'), color=color)
+            if totals is not None:
+                add(string='\t' + str(float(values[-1])), color=total_color)
+            parts.append('\n')
+    return ''.join(parts)
@@ -14,18 +14,19 @@
 # You should have received a copy of the GNU General Public License along with
 # pygrader.  If not, see <http://www.gnu.org/licenses/>.
 
-import io as _io
+import operator as _operator
 
-from jinja2 import Template
+from jinja2 import DictLoader, Environment
 
 from . import LOG as _LOG
+from . import map_jobs as _map_jobs
 from .email import construct_text_email as _construct_text_email
 from .email import send_emails as _send_emails
 from .storage import set_notified as _set_notified
-from .tabulate import tabulate as _tabulate
+from .tabulate import render_table as _render_table
 
 
-ASSIGNMENT_TEMPLATE = Template("""
+_ASSIGNMENT_SOURCE = """
 {{ grade.student.alias() }},
 
 You got {{ grade.points }} out of {{ grade.assignment.points }} available points on {{ grade.assignment.name }}.
@@ -34,10 +35,10 @@ You got {{ grade.points }} out of {{ grade.assignment.points }} available points
 {% endif %}
 Yours,
 {{ author.alias() }}
-""".strip())
+""".strip()
 #{{ grade.comment|wordwrap }}
 
-STUDENT_TEMPLATE = Template("""
+_STUDENT_SOURCE = """
 {{ target }},
 
 Grades:
@@ -55,27 +56,43 @@ Comments:
 
 Yours,
 {{ author.alias() }}
-""".strip())
+""".strip()
 
-COURSE_TEMPLATE = Template("""
+_COURSE_SOURCE = """
 {{ target }},
 
 Here are the (tab delimited) course grades to date:
 
 {{ table }}
 The available points (and weights) for each assignment are:
-{%- for assignment in course.active_assignments() %}
-  * {{ assignment.name }}:\t{{ assignment.points }}\t{{ assignment.weight }}
-{%- endfor %}
+{{- assignments }}
 
 Yours,
 {{ author.alias() }}
-""".strip())
+""".strip()
+
+# Share one environment, compiling each template once per process
+_ENVIRONMENT = Environment(
+    loader=DictLoader({
+            'assignment': _ASSIGNMENT_SOURCE,
+            'student': _STUDENT_SOURCE,
+            'course': _COURSE_SOURCE,
+            }),
+    auto_reload=False)
+
+ASSIGNMENT_TEMPLATE = _ENVIRONMENT.get_template('assignment')
+STUDENT_TEMPLATE = _ENVIRONMENT.get_template('student')
+COURSE_TEMPLATE = _ENVIRONMENT.get_template('course')
+
+# Grade ordering for a single student (see Grade.__lt__)
+_STUDENT_GRADE_KEY = _operator.attrgetter('assignment.due', 'assignment.name')
 
 
 class NotifiedCallback (object):
     """A callback for marking notifications with `_send_emails`
     """
+    __slots__ = ('basedir', 'grades')
+
     def __init__(self, basedir, grades):
         self.basedir = basedir
         self.grades = grades
@@ -95,45 +112,50 @@ def join_with_and(strings):
     'a and b'
     >>> join_with_and(['a'])
     'a'
+    >>> join_with_and([])
+    ''
     """
-    ret = [strings[0]]
-    for i,s in enumerate(strings[1:]):
-        if len(strings) > 2:
-            ret.append(', ')
-        else:
-            ret.append(' ')
-        if i == len(strings)-2:
-            ret.append('and ')
-        ret.append(s)
-    return ''.join(ret)
+    if len(strings) < 3:
+        return ' and '.join(strings)
+    return '{}, and {}'.format(', '.join(strings[:-1]), strings[-1])
+
+def _construct_emails(construct, items, jobs=1):
+    """Yield ``(item, construct(item))`` for each of ``items``.
+
+    ``jobs`` is passed through to `pygrader.map_jobs`, so messages
+    (and their signatures) can be built concurrently.
+    """
+    return _map_jobs(lambda item: (item, construct(item)), items, jobs=jobs)
 
 def assignment_email(basedir, author, course, assignment, student=None,
-                     cc=None, smtp=None, debug_target=None, dry_run=False):
+                     cc=None, smtp=None, debug_target=None, dry_run=False,
+                     jobs=1):
     """Send each student an email with their grade on `assignment`
     """
     _send_emails(
         emails=_assignment_email(
             basedir=basedir, author=author, course=course,
-            assignment=assignment, student=student, cc=cc),
+            assignment=assignment, student=student, cc=cc, jobs=jobs),
         smtp=smtp, debug_target=debug_target, dry_run=dry_run)
 
 def _assignment_email(basedir, author, course, assignment, student=None,
-                      cc=None):
+                      cc=None, jobs=1):
     """Iterate through composed assignment `Message`\s
     """
     if student:
         students = [student]
     else:
         students = course.people
-    for student in students:
-        try:
-            grade = course.grade(student=student, assignment=assignment)
-        except ValueError:
-            continue
-        if grade.notified:
-            continue
-        yield (construct_assignment_email(author=author, grade=grade, cc=cc),
-               NotifiedCallback(basedir=basedir, grades=[grade]))
+    grades = {}
+    for grade in course.grades:
+        if grade.assignment == assignment:
+            grades.setdefault(grade.student, grade)  # like Course.grade
+    grades = [grades.get(student) for student in students]
+    grades = [g for g in grades if g is not None and not g.notified]
+    def construct(grade):
+        return construct_assignment_email(author=author, grade=grade, cc=cc)
+    for grade,message in _construct_emails(construct, grades, jobs=jobs):
+        yield (message, NotifiedCallback(basedir=basedir, grades=[grade]))
 
 def construct_assignment_email(author, grade, cc=None):
     """Construct a `Message` notfiying a student of `grade`
@@ -189,35 +211,79 @@ def construct_assignment_email(author, grade, cc=None):
     return _construct_text_email(
         author=author, targets=[grade.student], cc=cc,
         subject='Your {} grade'.format(grade.assignment.name),
-        text=ASSIGNMENT_TEMPLATE.render(author=author, grade=grade))
+        text=_render_assignment(author=author, grade=grade))
+
+def _render_assignment(author, grade):
+    """Render `ASSIGNMENT_TEMPLATE` without going through Jinja
+
+    >>> from pygrader.model.person import Person
+    >>> from pygrader.model.assignment import Assignment
+    >>> from pygrader.model.grade import Grade
+    >>> author = Person(name='Jack', emails=['a@b.net'])
+    >>> student = Person(name='Jill', emails=['c@d.net'])
+    >>> assignment = Assignment(name='Exam 1', points=3)
+    >>> grade = Grade(student=student, assignment=assignment, points=2)
+    >>> print(_render_assignment(author=author, grade=grade))
+    Jill,
+    <BLANKLINE>
+    You got 2 out of 3 available points on Exam 1.
+    <BLANKLINE>
+    Yours,
+    Jack
+    >>> for comment in [None, 'Some comment.']:
+    ...     grade.comment = comment
+    ...     print(_render_assignment(author=author, grade=grade) ==
+    ...           ASSIGNMENT_TEMPLATE.render(author=author, grade=grade))
+    True
+    True
+    """
+    if grade.comment:
+        comment = '\n{}\n'.format(grade.comment)
+    else:
+        comment = ''
+    return (
+        '{},\n\n'
+        'You got {} out of {} available points on {}.\n'
+        '{}\n'
+        'Yours,\n'
+        '{}').format(
+        grade.student.alias(), grade.points, grade.assignment.points,
+        grade.assignment.name, comment, author.alias())
 
 def student_email(basedir, author, course, student=None, cc=None, old=False,
-                  smtp=None, debug_target=None, dry_run=False):
+                  smtp=None, debug_target=None, dry_run=False, jobs=1):
     """Send each student an email with their grade to date
     """
     _send_emails(
         emails=_student_email(
             basedir=basedir, author=author, course=course, student=student,
-            cc=cc, old=old),
+            cc=cc, old=old, jobs=jobs),
         smtp=smtp, debug_target=debug_target, dry_run=dry_run)
 
-def _student_email(basedir, author, course, student=None, targets=None, cc=None, old=False):
+def _student_email(basedir, author, course, student=None, targets=None,
+                   cc=None, old=False, jobs=1):
     """Iterate through composed student `Message`\s
     """
     if student:
         students = [student]
     else:
         students = course.people
+    student_grades = {}
+    for grade in course.grades:
+        student_grades.setdefault(grade.student, []).append(grade)
+    selected = []
     for student in students:
-        grades = [g for g in course.grades if g.student == student]
+        grades = student_grades.get(student, [])
         if not old:
             grades = [g for g in grades if not g.notified]
-        if not grades:
-            continue
-        yield (construct_student_email(
-                author=author, course=course, grades=grades, targets=targets,
-                cc=cc),
-               NotifiedCallback(basedir=basedir, grades=grades))
+        if grades:
+            selected.append(grades)
+    def construct(grades):
+        return construct_student_email(
+            author=author, course=course, grades=grades, targets=targets,
+            cc=cc)
+    for grades,message in _construct_emails(construct, selected, jobs=jobs):
+        yield (message, NotifiedCallback(basedir=basedir, grades=grades))
 
 def construct_student_email(author, course, grades, targets=None, cc=None):
     """Construct a `Message` notfiying a student of `grade`
@@ -371,7 +437,8 @@ def construct_student_email(author, course, grades, targets=None, cc=None):
     return _construct_text_email(
         author=author, targets=targets, cc=cc, subject=subject,
         text=STUDENT_TEMPLATE.render(
-            author=author, target=target, grades=sorted(grades)))
+            author=author, target=target,
+            grades=sorted(grades, key=_STUDENT_GRADE_KEY)))
 
 def course_email(basedir, author, course, targets, assignment=None,
                  student=None, cc=None, smtp=None, debug_target=None,
@@ -442,13 +509,36 @@ def construct_course_email(author, course, targets, cc=None):
     <BLANKLINE>
     Yours,
     Jack
+
+    Courses without any grades skip the table.
+
+    >>> course = Course(assignments=assignments, people=[student])
+    >>> msg = construct_course_email(
+    ...     author=author, course=course, targets=[prof])
+    >>> print(msg.get_payload())
+    H.D.,
+    <BLANKLINE>
+    Here are the (tab delimited) course grades to date:
+    <BLANKLINE>
+    (no grades yet)
+    <BLANKLINE>
+    The available points (and weights) for each assignment are:
+    <BLANKLINE>
+    Yours,
+    Jack
     """
     target = join_with_and([t.alias() for t in targets])
-    table = _io.StringIO()
-    _tabulate(course=course, statistics=True, stream=table, use_color=False)
+    if course.grades:
+        table = _render_table(
+            course=course, statistics=True, use_color=False)
+    else:
+        table = '(no grades yet)\n'
+    assignments = ''.join(
+        '\n  * {0.name}:\t{0.points}\t{0.weight}'.format(assignment)
+        for assignment in course.active_assignments())
     return _construct_text_email(
         author=author, targets=targets, cc=cc,
         subject='Course grades',
         text=COURSE_TEMPLATE.render(
-            author=author, course=course, target=target,
-            table=table.getvalue()))
+            author=author, course=course, target=target, table=table,
+            assignments=assignments))
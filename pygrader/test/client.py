@@ -15,6 +15,10 @@
 # pygrader.  If not, see <http://www.gnu.org/licenses/>.
 
 import asynchat as _asynchat
+import email.generator as _email_generator
+import email.policy as _email_policy
+import io as _io
+import re as _re
 import socket as _socket
 
 from pgp_mime import email as _email
@@ -22,6 +26,25 @@ from pgp_mime import email as _email
 from .. import LOG as _LOG
 
 
+_SMTP_POLICY = _email_policy.compat32.clone(linesep='\r\n')
+_LEADING_DOT_REGEXP = _re.compile(b'^[.]', _re.MULTILINE)
+
+
+def _message_data(message):
+    """Return the dot-stuffed ``DATA`` payload for ``message``.
+
+    >>> from pgp_mime.email import encodedMIMEText
+    >>> message = encodedMIMEText('Ping\\n.\\n')
+    >>> _message_data(message).splitlines()[-4:]
+    [b'Ping', b'..', b'', b'.']
+    """
+    stream = _io.BytesIO()
+    generator = _email_generator.BytesGenerator(
+        stream, mangle_from_=False, policy=_SMTP_POLICY)
+    generator.flatten(message)
+    return _LEADING_DOT_REGEXP.sub(b'..', stream.getvalue()) + b'\r\n.'
+
+
 class MessageSender (_asynchat.async_chat):
     """A SMTP message sender using ``asyncore``.
 
@@ -54,7 +77,10 @@ class MessageSender (_asynchat.async_chat):
             self.commands = [command]
             self.responses = []
         _LOG.debug('push: {}'.format(command))
-        self.push(bytes(command + '\r\n', 'ascii'))
+        if not isinstance(command, bytes):
+            command = bytes(command, 'ascii')
+        self.push(command)
+        self.push(b'\r\n')
 
     def send_commands(self, commands):
         self.commands = commands
@@ -66,10 +92,10 @@ class MessageSender (_asynchat.async_chat):
         self.ibuffer.append(data)
 
     def found_terminator(self):
-        ibuffer = b''.join(self.ibuffer)
+        line = b''.join(self.ibuffer)
         self.ibuffer = []
-        self.ilines.append(ibuffer)
-        if len(self.ilines[-1]) >= 4 and self.ilines[-1][3] == ord(b' '):
+        self.ilines.append(line)
+        if line[3:4] == b' ':
             response = self.ilines
             self.ilines = []
             self.handle_response(response)
@@ -117,6 +143,6 @@ class MessageSender (_asynchat.async_chat):
             commands.append('rcpt TO:<{}>'.format(address))
         commands.extend([
                 'DATA',
-                message.as_string() + '\r\n.',
+                _message_data(message),
                 ])
         self.send_commands(commands=commands)
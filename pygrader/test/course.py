@@ -141,13 +141,14 @@ class StubCourse (object):
 
     def tree(self):
         paths = []
-        for dirpath,dirnames,filenames in _os.walk(self.basedir):
-            for dirname in dirnames:
-                paths.append(_os_path.join(dirpath, dirname))
-            for filename in filenames:
-                paths.append(_os_path.join(dirpath, filename))
-        for i,path in enumerate(paths):
-            paths[i] = _os_path.relpath(path, self.basedir)
+        stack = ['']  # directories relative to basedir
+        while stack:
+            dirpath = stack.pop()
+            for entry in _os.scandir(_os_path.join(self.basedir, dirpath)):
+                path = _os_path.join(dirpath, entry.name)
+                paths.append(path)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(path)
         paths.sort()
         return paths
 
@@ -18,41 +18,140 @@
 """
 
 import os as _os
-import os.path as _os_path
+import stat as _stat
 
+from . import map_jobs as _map_jobs
 
-def mtime(path, walk_directories=True):
-    if walk_directories and _os.path.isdir(path):
-        time = mtime(path, walk_directories=False)
-        for dirpath,dirnames,filenames in _os.walk(path):
-            for filename in filenames:
-                t = mtime(_os_path.join(dirpath, filename))
-                time = max(time, t)
-        return time
+
+def mtime(path, walk_directories=True, cache=None):
+    """Return the latest mtime for ``path`` (and the files below it).
+
+    Times are float seconds, as in ``os.stat(path).st_mtime``.
+
+    Pass the same ``cache`` dict to several calls to share directory
+    scans between them.
+    """
+    time = _mtime_ns(path, walk_directories=walk_directories, cache=cache)
+    # the same conversion os.stat uses to build st_mtime
+    return time // 1000000000 + (time % 1000000000) * 1e-9
+
+def _mtime_ns(path, walk_directories=True, cache=None):
+    """Return `mtime` as integer nanoseconds (``st_mtime_ns``).
+
+    Internal comparisons use this, because float seconds can round
+    files written close together to the same time.
+    """
     stat = _os.stat(path)
-    return stat.st_mtime
+    if walk_directories and _stat.S_ISDIR(stat.st_mode):
+        return max(stat.st_mtime_ns, _tree_mtime(path, cache=cache))
+    return stat.st_mtime_ns
+
+def _tree_mtime(path, cache=None, newer_than=None):
+    """Return the latest mtime of the files below the directory ``path``.
+
+    Like ``os.walk``, this does not descend into symlinked
+    directories.  Results are memoized by directory in ``cache``.
+
+    If ``newer_than`` is set, stop at the first mtime after it.  The
+    partial result is still after ``newer_than``, but it is not cached.
+    """
+    if cache is not None and path in cache:
+        return cache[path]
+    time = 0
+    with _os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if entry.is_symlink():
+                    continue
+                time = max(time, _tree_mtime(
+                        entry.path, cache=cache, newer_than=newer_than))
+            else:
+                time = max(time, entry.stat().st_mtime_ns)
+            if newer_than is not None and time > newer_than:
+                return time
+    if cache is not None:
+        cache[path] = time
+    return time
+
+def _entry_mtime(entry, cache=None, newer_than=None):
+    """Return ``mtime(entry.path)`` for a ``DirEntry``.
+
+    ``newer_than`` is handled as in `_tree_mtime`.
+    """
+    time = entry.stat().st_mtime_ns
+    if entry.is_dir() and (newer_than is None or time <= newer_than):
+        time = max(time, _tree_mtime(
+                entry.path, cache=cache, newer_than=newer_than))
+    return time
 
-def newer(a, b):
+def newer(a, b, cache=None):
     """Return ``True`` if ``a`` is newer than ``b``.
+
+    ``cache`` is passed through to `_mtime_ns`.
     """
-    return mtime(a) > mtime(b)
+    b_time = _mtime_ns(b, cache=cache)
+    a_stat = _os.stat(a)
+    if a_stat.st_mtime_ns > b_time:
+        return True
+    if not _stat.S_ISDIR(a_stat.st_mode):
+        return False
+    return _tree_mtime(a, cache=cache, newer_than=b_time) > b_time
 
-def todo(basedir, source, target):
+def todo(basedir, source, target, jobs=1):
     """Yield ``source``\s in ``basedir`` with old/missing ``target``\s.
+
+    Paths are yielded in sorted order as the tree is walked.  Hidden
+    directories (like ``.git``) and ``target`` directories are not
+    searched for sources.
+
+    ``jobs`` is passed through to `pygrader.map_jobs`, so sources can
+    be compared with their targets concurrently.
     """
-    for dirpath,dirnames,filenames in _os.walk(basedir):
-        names = dirnames + filenames
-        if source in names:
-            s = _os_path.join(dirpath, source)
-            t = _os_path.join(dirpath, target)
-            if target in names:
-                if newer(s, t):
-                    yield(s)
-            else:
-                yield s
+    cache = {}
+    def check(pair):
+        s,t = pair
+        if t is not None:
+            t_time = _entry_mtime(t, cache=cache)
+            if _entry_mtime(s, cache=cache, newer_than=t_time) <= t_time:
+                return None
+        return s.path
+    results = _map_jobs(
+        check, _todo_pairs(basedir, source, target), jobs=jobs)
+    try:
+        for path in results:
+            if path is not None:
+                yield path
+    finally:
+        results.close()
+
+def _todo_pairs(dirpath, source, target):
+    """Yield ``(source, target)`` ``DirEntry`` pairs below ``dirpath``.
+
+    ``target`` is ``None`` when it is missing.
+    """
+    try:
+        with _os.scandir(dirpath) as scan:
+            entries = {entry.name: entry for entry in scan}
+    except OSError:
+        return
+    # Keying subdirectories on 'name/' walks them in the same order
+    # sorted() would give the full paths ('a-b/x' < 'a/x').
+    children = {
+        entry.name + _os.sep: entry for entry in entries.values()
+        if entry.name != target and not entry.name.startswith('.') and
+        entry.is_dir() and not entry.is_symlink()}
+    if source in entries:
+        children[source] = None
+    for key in sorted(children):
+        entry = children[key]
+        if entry is None:
+            yield (entries[source], entries.get(target))
+        else:
+            for pair in _todo_pairs(entry.path, source, target):
+                yield pair
 
-def print_todo(basedir, source, target):
+def print_todo(basedir, source, target, jobs=1):
     """Print ``source``\s in ``basedir`` with old/missing ``target``\s.
     """
-    for path in sorted(todo(basedir, source, target)):
+    for path in todo(basedir, source, target, jobs=jobs):
         print(path)
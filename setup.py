@@ -16,7 +16,10 @@
 
 "Manage a course's grade database with email-based communication."
 
-from distutils.core import setup as _setup
+try:
+    from setuptools import setup as _setup
+except ImportError:  # fall back to the standard library
+    from distutils.core import setup as _setup
 import os.path as _os_path
 
 from pygrader import __version__
@@ -24,6 +27,9 @@ from pygrader import __version__
 
 _this_dir = _os_path.dirname(__file__)
 
+with open(_os_path.join(_this_dir, 'README'), 'r', encoding='utf-8') as f:
+    _long_description = f.read()
+
 _setup(
     name='pygrader',
     version=__version__,
@@ -34,19 +40,19 @@ _setup(
     license = 'GNU General Public License (GPL)',
     platforms = ['all'],
     description = __doc__,
-    long_description=open(_os_path.join(_this_dir, 'README'), 'r').read(),
+    long_description=_long_description,
     classifiers = [
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Education',
         'Operating System :: OS Independent',
         'License :: OSI Approved :: GNU General Public License (GPL)',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.2',
-        'Programming Language :: Python :: 3.3',
+        'Programming Language :: Python :: 3.7',
         'Topic :: Communications :: Email',
         'Topic :: Database',
         'Topic :: Education',
         ],
+    python_requires='>=3.7',
     scripts = ['bin/pg.py'],
     packages = [
         'pygrader', 'pygrader.handler', 'pygrader.model', 'pygrader.test'],